@@ -0,0 +1,48 @@
+"""
+Ahead-of-time compilation of the deprojection and model kernels. Running
+
+    python -m eddy._aot_build
+
+builds the ``eddy._deproj_aot`` extension module. If that module is present,
+``eddy.deprojection`` and ``eddy.models`` use it in place of the JIT kernels,
+so nothing needs compiling on the first call. The AOT kernels run serially.
+Delete the built module to go back to the parallel JIT kernels.
+"""
+
+import os
+from numba.pycc import CC
+from . import deprojection as dp
+from . import models as mod
+
+cc = CC('_deproj_aot')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+for f in ['f4', 'f8']:
+    flared_sig = 'void({0}[:], {0}[:], f8, f8, f8, f8, f8, f8, f8, f8, f8, '
+    flared_sig += 'i8, b1, {0}[:], {0}[:], {0}[:])'
+    flared_sig = flared_sig.format(f)
+    cc.export('flared_coords_kernel_' + f,
+              flared_sig)(dp._flared_coords_kernel.py_func)
+    cc.export('flared_coords_kernel_ipsi_' + f,
+              flared_sig)(dp._flared_coords_kernel_ipsi.py_func)
+    rotate_sig = 'void({0}[:], {0}[:], f8, f8, f8, {0}[:], {0}[:])'.format(f)
+    cc.export('rotate_deproject_kernel_' + f,
+              rotate_sig)(dp._rotate_deproject_kernel.py_func)
+    rotate_sig = 'void({0}[:], {0}[:], f8, f8, f8, {0}[:, :], {0}[:, :])'
+    cc.export('sky_rotate_deproject_kernel_' + f,
+              rotate_sig.format(f))(dp._sky_rotate_deproject_kernel.py_func)
+    polar_sig = 'void({0}[:], {0}[:], f8, f8, f8, b1, {0}[:, :], {0}[:, :])'
+    cc.export('midplane_polar_kernel_' + f,
+              polar_sig.format(f))(dp._midplane_polar_kernel.py_func)
+    cc.export('diskframe_r_t_kernel_' + f,
+              'void({0}[:], {0}[:], b1, {0}[:, :], {0}[:, :])'.format(f))(
+              dp._diskframe_r_t_kernel.py_func)
+    cc.export('proj_vkep_kernel_' + f,
+              'void({0}[:], {0}[:], {0}[:], f8, f8, {0}[:])'.format(f))(
+              mod._proj_vkep_kernel.py_func)
+    vpow_sig = 'void({0}[:], {0}[:], f8, f8, f8, f8, f8, f8, f8, f8, {0}[:])'
+    cc.export('proj_vpow_kernel_' + f,
+              vpow_sig.format(f))(mod._proj_vpow_kernel.py_func)
+
+if __name__ == '__main__':
+    cc.compile()
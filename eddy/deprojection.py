@@ -1,91 +1,480 @@
+import math
 import numpy as np
 import numba
+try:
+    import numexpr as ne
+    USE_NUMEXPR = True
+except ImportError:
+    USE_NUMEXPR = False
+try:
+    from . import _deproj_aot
+except ImportError:
+    _deproj_aot = None
+try:
+    import cupy as cp
+except ImportError:
+    cp = None
+
+# Fast-math flags for the kernels. We leave out 'nnan' and 'ninf' as pixels
+# can be NaN and ``r_taper`` defaults to ``np.inf``.
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+# Largest integer flaring angle, psi, which uses repeated multiplication.
+_MAX_INT_PSI = 8
+
+# Set to False to use the pure-NumPy flared surface solver.
+USE_NUMBA = True
+
+# Approximate L2 cache size used to choose the row-blocks of the NumPy solver.
+_L2_BYTES = 1024 * 1024
+
+# Set to True to use a polynomial arctan2, accurate to ~2e-6 rad, when solving
+# for the flared surface and disk-frame coordinates.
+USE_FAST_MATH = False
+
+# Minimax coefficients for arctan(z) on [0, 1], odd powers of z.
+_ATAN_COEFFS = (0.99997726, -0.33262347, 0.19354346,
+                -0.11643287, 0.05265332, -0.01172120)
+
+# Set to True to solve for the flared surface on the GPU (requires cupy).
+USE_GPU = False
+
+
+def set_num_threads(nthreads=None):
+    """Set the number of threads used by the parallel kernels (default all)."""
+    if nthreads is None:
+        nthreads = numba.config.NUMBA_NUM_THREADS
+    numba.set_num_threads(min(int(nthreads), numba.config.NUMBA_NUM_THREADS))
+
+
+def _aot(kernel, dtype):
+    """Return the ahead-of-time compiled ``kernel`` for ``dtype`` if built."""
+    if _deproj_aot is None:
+        return kernel
+    suffix = {'float32': 'f4', 'float64': 'f8'}.get(np.dtype(dtype).name)
+    name = '{}_{}'.format(kernel.__name__.lstrip('_'), suffix)
+    return getattr(_deproj_aot, name, kernel)
 
 
 def get_flared_coords(x0, y0, xaxis, yaxis, inc, PA, z0,
-                    r_cavity, r_taper, psi, q_taper, w_r, w_i, w_t, niter):
+                    r_cavity, r_taper, psi, q_taper, w_r, w_i, w_t, niter,
+                    dtype=np.float32):
     """Return cyclindrical coords of surface in [arcsec, rad, arcsec]."""
-    x_mid, y_mid = get_midplane_cart_coords(x0, y0, inc, PA, xaxis, yaxis)
+    if USE_GPU and cp is not None:
+        return _get_flared_coords_gpu(x0, y0, xaxis, yaxis, inc, PA, z0,
+                                      r_cavity, r_taper, psi, q_taper, w_r,
+                                      w_i, w_t, niter, dtype=dtype)
+    x_mid, y_mid = get_midplane_cart_coords(x0, y0, inc, PA, xaxis, yaxis,
+                                            dtype=dtype)
     return _get_flared_coords(x_mid, y_mid, inc, z0,
-                        r_cavity, r_taper, psi, q_taper, w_r, w_i, w_t, niter)
+                        r_cavity, r_taper, psi, q_taper, w_r, w_i, w_t, niter,
+                        dtype=dtype)
+
+
+# Per-pixel CUDA version of ``_flared_pixel``, looping over ``niter`` on device.
+_CUDA_FLARED = """
+double x_d = x, y_d = y, rs, zz;
+double rr = sqrt(x_d * x_d + y_d * y_d), tt = atan2(y_d, x_d);
+for (long long n = 0; n <= niter; n++) {
+    rs = rr - r_cavity;
+    rs = rs < 0.0 ? 0.0 : rs;
+    zz = z0 * pow(rs, psi) * exp(-pow(rs / r_taper, q_taper));
+    zz = zz < 0.0 ? 0.0 : zz;
+    if (n == niter) break;
+    zz += rs * tan(wi_rad * exp(-0.5 * (rs / w_r) * (rs / w_r))
+                   * sin(tt - wt_rad));
+    y_d = y + zz * tan_inc;
+    rr = sqrt(x_d * x_d + y_d * y_d);
+    tt = atan2(y_d, x_d);
+}
+r = rr;
+t = tt;
+z = zz;
+"""
+
+if cp is not None:
+    _flared_coords_gpu_kernel = cp.ElementwiseKernel(
+        'T x, T y, float64 tan_inc, float64 z0, float64 r_cavity, '
+        'float64 r_taper, float64 psi, float64 q_taper, float64 w_r, '
+        'float64 wi_rad, float64 wt_rad, int64 niter',
+        'T r, T t, T z', _CUDA_FLARED, 'eddy_flared_coords')
+
+
+def _get_flared_coords_gpu(x0, y0, xaxis, yaxis, inc, PA, z0,
+                           r_cavity, r_taper, psi, q_taper, w_r, w_i, w_t,
+                           niter, dtype=np.float32):
+    """As ``get_flared_coords`` but with the whole pipeline run by cupy."""
+    x_sky = cp.asarray(np.asarray(xaxis) - x0, dtype=dtype)[None, :]
+    y_sky = cp.asarray(np.asarray(yaxis) - y0, dtype=dtype)[:, None]
+    cos_PA, sin_PA = math.cos(math.radians(PA)), math.sin(math.radians(PA))
+    x_mid = y_sky * cos_PA + x_sky * sin_PA
+    y_mid = (x_sky * cos_PA - y_sky * sin_PA) / math.cos(math.radians(inc))
+    r, t, z = _flared_coords_gpu_kernel(
+        x_mid, y_mid, math.tan(math.radians(inc)), float(z0),
+        float(r_cavity), float(r_taper), float(psi), float(q_taper),
+        float(w_r), math.radians(w_i), math.radians(w_t), int(niter))
+    return cp.asnumpy(r), cp.asnumpy(t), cp.asnumpy(z)
+
 
-# @numba.njit
 def _get_flared_coords(x_mid, y_mid, inc, z0,
-                    r_cavity, r_taper, psi, q_taper, w_r, w_i, w_t, niter):
-    r_tmp, t_tmp = np.hypot(x_mid, y_mid), np.arctan2(y_mid, x_mid)
+                    r_cavity, r_taper, psi, q_taper, w_r, w_i, w_t, niter,
+                    dtype=np.float32):
+    """Flatten the midplane coords and hand them to the fused kernel."""
+    shape = np.shape(x_mid)
+    x_mid = np.ascontiguousarray(x_mid, dtype=dtype).ravel()
+    y_mid = np.ascontiguousarray(y_mid, dtype=dtype).ravel()
+    r_out = np.empty(x_mid.size, dtype=dtype)
+    t_out = np.empty(x_mid.size, dtype=dtype)
+    z_out = np.empty(x_mid.size, dtype=dtype)
+    if niter == 0 or (z0 == 0.0 and w_i == 0.0):
+        arctan2 = fast_arctan2 if USE_FAST_MATH else np.arctan2
+        np.sqrt(x_mid * x_mid + y_mid * y_mid, out=r_out)
+        arctan2(y_mid, x_mid, out=t_out)
+        z_func(np.maximum(r_out - r_cavity, 0.0), z0, r_taper, psi, q_taper,
+               out=z_out)
+        return r_out.reshape(shape), t_out.reshape(shape), z_out.reshape(shape)
+    if not USE_NUMBA:
+        _flared_coords_numpy(x_mid, y_mid, inc, z0, r_cavity, r_taper, psi,
+                             q_taper, w_r, w_i, w_t, niter, r_out, t_out,
+                             z_out, ncols=shape[-1] if shape else 1)
+        return r_out.reshape(shape), t_out.reshape(shape), z_out.reshape(shape)
+    psi = float(psi)
+    if psi.is_integer() and 0.0 <= psi <= _MAX_INT_PSI:
+        kernel = _flared_coords_kernel_ipsi
+    else:
+        kernel = _flared_coords_kernel
+    log_r_taper = math.log(r_taper) if r_taper > 0.0 else -math.inf
+    kernel = _aot(kernel, dtype)
+    kernel(x_mid, y_mid, math.tan(math.radians(inc)), float(z0),
+           float(r_cavity), log_r_taper, psi, float(q_taper), float(w_r),
+           math.radians(w_i), math.radians(w_t), int(niter),
+           bool(USE_FAST_MATH), r_out, t_out, z_out)
+    return r_out.reshape(shape), t_out.reshape(shape), z_out.reshape(shape)
+
+
+def _flared_coords_numpy(x_mid, y_mid, inc, z0, r_cavity, r_taper, psi,
+                         q_taper, w_r, w_i, w_t, niter, r_out, t_out, z_out,
+                         ncols=1):
+    """NumPy solver, running all iterations on blocks of rows which fit in L2."""
+    tan_inc = math.tan(math.radians(inc))
+    arctan2 = fast_arctan2 if USE_FAST_MATH else np.arctan2
+    nrows = max(1, _L2_BYTES // (7 * x_mid.itemsize * ncols))
+    block = nrows * ncols
+    buffers = np.empty((4, min(block, x_mid.size)), dtype=r_out.dtype)
+    for i in range(0, x_mid.size, block):
+        x, y = x_mid[i:i+block], y_mid[i:i+block]
+        r_tmp, t_tmp = r_out[i:i+block], t_out[i:i+block]
+        z_tmp = z_out[i:i+block]
+        xx, y_tmp, w_tmp, r_shift = buffers[:, :x.size]
+        np.multiply(x, x, out=xx)
+        np.sqrt(np.add(xx, np.multiply(y, y, out=y_tmp), out=r_tmp),
+                out=r_tmp)
+        arctan2(y, x, out=t_tmp)
+        for _ in range(niter):
+            np.subtract(r_tmp, r_cavity, out=r_shift)
+            np.maximum(r_shift, 0.0, out=r_shift)
+            z_func(r_shift, z0, r_taper, psi, q_taper, out=z_tmp)
+            z_tmp += w_func(r_shift, t_tmp, w_r, w_i, w_t, out=w_tmp)
+            np.add(y, np.multiply(z_tmp, tan_inc, out=y_tmp), out=y_tmp)
+            arctan2(y_tmp, x, out=t_tmp)
+            np.square(y_tmp, out=y_tmp)
+            np.sqrt(np.add(xx, y_tmp, out=y_tmp), out=r_tmp)
+        np.subtract(r_tmp, r_cavity, out=r_shift)
+        np.maximum(r_shift, 0.0, out=r_shift)
+        z_func(r_shift, z0, r_taper, psi, q_taper, out=z_tmp)
+
+
+@numba.njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def _flared_coords_kernel(x_mid, y_mid, tan_inc, z0, r_cavity, log_r_taper,
+                          psi, q_taper, w_r, wi_rad, wt_rad, niter, fast,
+                          r_out, t_out, z_out):
+    """Per-pixel fixed-point iteration for the flared surface."""
+    for i in numba.prange(x_mid.size):
+        r_out[i], t_out[i], z_out[i] = _flared_pixel_unrolled(
+            x_mid[i], y_mid[i], tan_inc, z0, r_cavity, log_r_taper, psi,
+            q_taper, w_r, wi_rad, wt_rad, niter, fast, _z_scalar)
+
+
+@numba.njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def _flared_coords_kernel_ipsi(x_mid, y_mid, tan_inc, z0, r_cavity,
+                               log_r_taper, psi, q_taper, w_r, wi_rad, wt_rad,
+                               niter, fast, r_out, t_out, z_out):
+    """As ``_flared_coords_kernel`` but for small, integer ``psi`` values."""
+    for i in numba.prange(x_mid.size):
+        r_out[i], t_out[i], z_out[i] = _flared_pixel_unrolled(
+            x_mid[i], y_mid[i], tan_inc, z0, r_cavity, log_r_taper, psi,
+            q_taper, w_r, wi_rad, wt_rad, niter, fast, _z_scalar_ipsi)
+
+
+@numba.njit(inline='always', error_model='numpy')
+def _flared_pixel_unrolled(x, y, tan_inc, z0, r_cavity, log_r_taper, psi,
+                           q_taper, w_r, wi_rad, wt_rad, niter, fast, z_scalar):
+    """``_flared_pixel`` with constant ``niter`` for the common values so the
+    iterations are fully unrolled. The branch is the same for every pixel."""
+    if niter == 2:
+        return _flared_pixel(x, y, tan_inc, z0, r_cavity, log_r_taper, psi,
+                             q_taper, w_r, wi_rad, wt_rad, 2, fast, z_scalar)
+    if niter == 3:
+        return _flared_pixel(x, y, tan_inc, z0, r_cavity, log_r_taper, psi,
+                             q_taper, w_r, wi_rad, wt_rad, 3, fast, z_scalar)
+    if niter == 5:
+        return _flared_pixel(x, y, tan_inc, z0, r_cavity, log_r_taper, psi,
+                             q_taper, w_r, wi_rad, wt_rad, 5, fast, z_scalar)
+    return _flared_pixel(x, y, tan_inc, z0, r_cavity, log_r_taper, psi,
+                         q_taper, w_r, wi_rad, wt_rad, niter, fast, z_scalar)
+
+
+@numba.njit(inline='always', error_model='numpy')
+def _flared_pixel(x, y, tan_inc, z0, r_cavity, log_r_taper, psi, q_taper,
+                  w_r, wi_rad, wt_rad, niter, fast, z_scalar):
+    """Return (r, t, z) for a single pixel of the flared surface."""
+    # Coordinates are O(1) arcsec so the overflow protection of hypot is not
+    # needed and the plain square root vectorizes far better.
+    r_tmp, t_tmp = math.sqrt(x * x + y * y), _atan2(y, x, fast)
     for _ in range(niter):
-        z_tmp = z_func(r_tmp, z0, r_cavity, r_taper, psi, q_taper) +\
-         w_func(r_tmp, t_tmp, r_cavity, w_r, w_i, w_t)
-        y_tmp = y_mid + z_tmp * np.tan(np.radians(inc))
-        r_tmp = np.hypot(y_tmp, x_mid)
-        t_tmp = np.arctan2(y_tmp, x_mid)
-    return r_tmp, t_tmp, z_func(r_tmp, z0, r_cavity, r_taper, psi, q_taper)
+        z_tmp = z_scalar(r_tmp, z0, r_cavity, log_r_taper, psi, q_taper)
+        z_tmp += _w_scalar(r_tmp, t_tmp, r_cavity, w_r, wi_rad, wt_rad)
+        y_tmp = y + z_tmp * tan_inc
+        r_tmp = math.sqrt(x * x + y_tmp * y_tmp)
+        t_tmp = _atan2(y_tmp, x, fast)
+    z_tmp = z_scalar(r_tmp, z0, r_cavity, log_r_taper, psi, q_taper)
+    return r_tmp, t_tmp, z_tmp
+
+
+@numba.njit(inline='always', error_model='numpy')
+def _atan2(y, x, fast):
+    """``math.atan2`` or, if ``fast``, the branchless polynomial version."""
+    if not fast:
+        return math.atan2(y, x)
+    ax, ay = abs(x), abs(y)
+    mx = ax if ax > ay else ay
+    mn = ay if ax > ay else ax
+    z = 0.0 if mx == 0.0 else mn / mx
+    zz = z * z
+    c0, c1, c2, c3, c4, c5 = _ATAN_COEFFS
+    t = z * (c0 + zz * (c1 + zz * (c2 + zz * (c3 + zz * (c4 + zz * c5)))))
+    t = 0.5 * math.pi - t if ay > ax else t
+    t = math.pi - t if x < 0.0 else t
+    return math.copysign(t, y)
+
+
+def fast_arctan2(y, x, out=None):
+    """Polynomial ``np.arctan2``, accurate to ~2e-6 rad."""
+    ax, ay = np.abs(x), np.abs(y)
+    mx, mn = np.maximum(ax, ay), np.minimum(ax, ay)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = np.where(mx == 0.0, 0.0, mn / mx)
+    zz = z * z
+    c0, c1, c2, c3, c4, c5 = _ATAN_COEFFS
+    t = z * (c0 + zz * (c1 + zz * (c2 + zz * (c3 + zz * (c4 + zz * c5)))))
+    t = np.where(ay > ax, 0.5 * np.pi - t, t)
+    t = np.where(x < 0.0, np.pi - t, t)
+    return np.copysign(t, y, out=out)
+
+
+@numba.njit(inline='always', error_model='numpy')
+def _clip0(x):
+    """Branchless ``max(x, 0)`` which lowers to a compare and select."""
+    return 0.0 if x < 0.0 else x
+
+
+@numba.njit(inline='always', error_model='numpy')
+def _z_scalar(r_in, z0, r_cavity, log_r_taper, psi, q_taper):
+    """Scalar ``z_func`` sharing a single log between both power laws."""
+    r = _clip0(r_in - r_cavity)
+    if r == 0.0:
+        z = z0 * math.pow(0.0, psi) * math.exp(-math.pow(0.0, q_taper))
+        return _clip0(z)
+    log_r = math.log(r)
+    z = psi * log_r - math.exp(q_taper * (log_r - log_r_taper))
+    return _clip0(z0 * math.exp(z))
+
+
+@numba.njit(inline='always', error_model='numpy')
+def _z_scalar_ipsi(r_in, z0, r_cavity, log_r_taper, psi, q_taper):
+    """Scalar ``z_func`` for integer ``psi``, skipping the untapered exp."""
+    r = _clip0(r_in - r_cavity)
+    z = z0
+    for _ in range(int(psi)):
+        z *= r
+    if log_r_taper < math.inf and r > 0.0:
+        z *= math.exp(-math.exp(q_taper * (math.log(r) - log_r_taper)))
+    return _clip0(z)
+
+
+@numba.njit(inline='always', error_model='numpy')
+def _w_scalar(r_in, t, r_cavity, w_r, wi_rad, wt_rad):
+    """Scalar version of ``w_func`` for use inside kernels. Angles in [rad]."""
+    r = _clip0(r_in - r_cavity)
+    warp = wi_rad * math.exp(-0.5 * (r / w_r)**2)
+    return r * math.tan(warp * math.sin(t - wt_rad))
 
 
-# @numba.njit
-def z_func(r_in, z0, r_cavity, r_taper, psi, q_taper):
-    r = np.maximum(r_in - r_cavity, 0.0)
-    # print('r dtype', r.dtype)
-    z = z0 * np.power(r, psi) * np.exp(-np.power(r / r_taper, q_taper))
-    # print('z dtype', z.dtype)
-    return np.maximum(z, 0.0)
+# numexpr emission height and warp, with ``r`` already shifted by the cavity.
+_NE_Z = "z0 * r**psi * exp(-(r / r_taper)**q_taper)"
+_NE_Z = "where({z} < 0.0, 0.0, {z})".format(z=_NE_Z)
+_NE_W = "r * tan(wi_rad * exp(-0.5 * (r / w_r)**2) * sin(t - wt_rad))"
 
 
-# @numba.njit
-def w_func(r_in, t, r_cavity, w_r, w_i, w_t):
-    r = np.maximum(r_in - r_cavity, 0.0)
-    # print('wr dtype', r.dtype)
-    warp = np.radians(w_i) * np.exp(-0.5 * (r / w_r)**2)
-    # print('waro dtype', warp.dtype)
-    return r * np.tan(warp * np.sin(t - np.radians(w_t)))
+def z_func(r, z0, r_taper, psi, q_taper, out=None):
+    """Return the emission height in [arcsec] at the radius ``r``, already
+    shifted by the cavity, i.e. ``max(r - r_cavity, 0)``."""
+    if z0 == 0.0:
+        return np.multiply(r, 0.0, out=out)
+    if USE_NUMEXPR:
+        return ne.evaluate(_NE_Z, local_dict=dict(
+            r=r, z0=z0, r_taper=r_taper, psi=psi, q_taper=q_taper),
+            out=out, casting='same_kind')
+    if out is None:
+        out = np.empty(np.shape(r), dtype=np.result_type(r, 1.0))
+    z = np.divide(r, r_taper, out=out)
+    np.power(z, q_taper, out=z)
+    np.exp(np.negative(z, out=z), out=z)
+    z *= np.power(r, psi)
+    z *= z0
+    return np.maximum(z, 0.0, out=z)
+
+
+def w_func(r, t, w_r, w_i, w_t, out=None):
+    """Return the warp height in [arcsec] at (``r``, ``t``) where, as for
+    ``z_func``, ``r`` is already shifted by the cavity."""
+    if w_i == 0.0:
+        return np.multiply(r, 0.0, out=out)
+    if USE_NUMEXPR:
+        return ne.evaluate(_NE_W, local_dict=dict(
+            r=r, t=t, w_r=w_r, wi_rad=math.radians(w_i),
+            wt_rad=math.radians(w_t)), out=out, casting='same_kind')
+    if out is None:
+        out = np.empty(np.shape(r), dtype=np.result_type(r, 1.0))
+    warp = np.divide(r, w_r, out=out)
+    np.square(warp, out=warp)
+    warp *= -0.5
+    np.exp(warp, out=warp)
+    warp *= math.radians(w_i)
+    warp *= np.sin(t - math.radians(w_t))
+    np.tan(warp, out=warp)
+    return np.multiply(warp, r, out=warp)
 
 
-@numba.njit
 def rotate_coords(x, y, PA):
     """Rotate (x, y) by PA [deg]."""
-    x_rot = y * np.cos(np.radians(PA)) + x * np.sin(np.radians(PA))
-    y_rot = x * np.cos(np.radians(PA)) - y * np.sin(np.radians(PA))
-    return x_rot, y_rot
+    return _rotate_deproject(x, y, PA, 0.0)
+
+
+def _rotate_deproject(x, y, PA, inc):
+    """Rotate (x, y) by PA [deg] then deproject by inc [deg] in a single pass."""
+    x, y = np.broadcast_arrays(x, y)
+    shape, dtype = x.shape, np.result_type(x, y, np.float32)
+    x = np.ascontiguousarray(x, dtype=dtype).ravel()
+    y = np.ascontiguousarray(y, dtype=dtype).ravel()
+    x_out = np.empty(x.size, dtype=dtype)
+    y_out = np.empty(x.size, dtype=dtype)
+    PA = math.radians(PA)
+    _aot(_rotate_deproject_kernel, dtype)(x, y, math.cos(PA), math.sin(PA),
+                                          1.0 / math.cos(math.radians(inc)),
+                                          x_out, y_out)
+    return x_out.reshape(shape), y_out.reshape(shape)
+
+
+@numba.njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def _rotate_deproject_kernel(x, y, cos_PA, sin_PA, sec_inc, x_out, y_out):
+    """Per-pixel rotation and deprojection into the preallocated outputs."""
+    for i in numba.prange(x.size):
+        x_out[i] = y[i] * cos_PA + x[i] * sin_PA
+        y_out[i] = (x[i] * cos_PA - y[i] * sin_PA) * sec_inc
 
 
-@numba.njit
+@numba.njit(error_model='numpy')
 def deproject_coords(x, y, inc):
     """Deproject (x, y) by inc [deg]."""
-    return x, y / np.cos(np.radians(inc))
+    return x, y / math.cos(math.radians(inc))
 
 
-def get_cart_sky_coords(x0, y0, xaxis, yaxis):
+def get_cart_sky_coords(x0, y0, xaxis, yaxis, dtype=np.float32):
     """Return cartesian sky coordinates in [arcsec, arcsec]."""
-    return np.meshgrid(xaxis - x0, yaxis - y0)
+    x_sky = np.asarray(xaxis - x0, dtype=dtype)
+    y_sky = np.asarray(yaxis - y0, dtype=dtype)
+    return x_sky[None, :], y_sky[:, None]
 
 
-def get_midplane_cart_coords(x0, y0, inc, PA, xaxis, yaxis):
+def get_midplane_cart_coords(x0, y0, inc, PA, xaxis, yaxis, dtype=np.float32):
     """Return cartesian coordaintes of midplane in [arcsec, arcsec]."""
-    x_sky, y_sky = get_cart_sky_coords(x0, y0, xaxis, yaxis)
-    x_rot, y_rot = rotate_coords(x_sky, y_sky, PA)
-    return deproject_coords(x_rot, y_rot, inc)
+    x_sky, y_sky = get_cart_sky_coords(x0, y0, xaxis, yaxis, dtype=dtype)
+    x_sky, y_sky = x_sky[0], y_sky[:, 0]
+    x_out = np.empty((y_sky.size, x_sky.size), dtype=dtype)
+    y_out = np.empty((y_sky.size, x_sky.size), dtype=dtype)
+    PA = math.radians(PA)
+    _aot(_sky_rotate_deproject_kernel, dtype)(
+        x_sky, y_sky, math.cos(PA), math.sin(PA),
+        1.0 / math.cos(math.radians(inc)), x_out, y_out)
+    return x_out, y_out
 
 
-@numba.njit
-def get_midplane_polar_coords(x0, y0, inc, PA, xaxis, yaxis):
+@numba.njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def _sky_rotate_deproject_kernel(x_sky, y_sky, cos_PA, sin_PA, sec_inc,
+                                 x_out, y_out):
+    """As ``_rotate_deproject_kernel`` but taking the 1D sky axes."""
+    for i in numba.prange(y_sky.size):
+        for j in range(x_sky.size):
+            x_out[i, j] = y_sky[i] * cos_PA + x_sky[j] * sin_PA
+            y_out[i, j] = (x_sky[j] * cos_PA - y_sky[i] * sin_PA) * sec_inc
+
+
+def get_midplane_polar_coords(x0, y0, inc, PA, xaxis, yaxis,
+                              dtype=np.float32):
     """Return the polar coordinates of midplane in [arcsec, radians]."""
-    x_mid, y_mid = get_midplane_cart_coords(x0, y0, inc, PA)
-    return np.hypot(y_mid, x_mid), np.arctan2(y_mid, x_mid)
+    x_sky, y_sky = get_cart_sky_coords(x0, y0, xaxis, yaxis, dtype=dtype)
+    x_sky, y_sky = x_sky[0], y_sky[:, 0]
+    r_out = np.empty((y_sky.size, x_sky.size), dtype=dtype)
+    t_out = np.empty((y_sky.size, x_sky.size), dtype=dtype)
+    PA = math.radians(PA)
+    _aot(_midplane_polar_kernel, dtype)(
+        x_sky, y_sky, math.cos(PA), math.sin(PA),
+        1.0 / math.cos(math.radians(inc)), bool(USE_FAST_MATH), r_out, t_out)
+    return r_out, t_out
+
 
+@numba.njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def _midplane_polar_kernel(x_sky, y_sky, cos_PA, sin_PA, sec_inc, fast,
+                           r_out, t_out):
+    """Rotate, deproject and convert the 1D sky axes to polar coordinates."""
+    for i in numba.prange(y_sky.size):
+        for j in range(x_sky.size):
+            x_mid = y_sky[i] * cos_PA + x_sky[j] * sin_PA
+            y_mid = (x_sky[j] * cos_PA - y_sky[i] * sin_PA) * sec_inc
+            r_out[i, j] = math.sqrt(x_mid * x_mid + y_mid * y_mid)
+            t_out[i, j] = _atan2(y_mid, x_mid, fast)
 
-@numba.njit
+
+@numba.njit(error_model='numpy')
 def get_r_t(x_disk, y_disk):
-    r_disk = np.hypot(x_disk, y_disk)
+    # As in ``_flared_pixel``, sqrt rather than hypot as the coordinates are
+    # far from the overflow limit.
+    r_disk = np.sqrt(x_disk * x_disk + y_disk * y_disk)
     t_disk = np.arctan2(y_disk, x_disk)
     return r_disk, t_disk
 
 
-def get_diskframe_coords(xaxis, yaxis, nxpix, nypix, extend=2.0, oversample=0.5):
-    """Disk-frame coordinates based on the cube axes."""
-    x_disk = np.linspace(extend * xaxis[0], extend * xaxis[-1],
-                         int(nxpix * oversample))[::-1]
+def get_diskframe_coords(xaxis, yaxis, nxpix, nypix, extend=2.0, oversample=0.5,
+                         dtype=np.float32):
+    """Disk-frame coordinates based on the cube axes. The x and y coordinates
+    are returned as broadcastable (1, nx) and (ny, 1) arrays."""
+    x_disk = np.linspace(extend * xaxis[-1], extend * xaxis[0],
+                         int(nxpix * oversample), dtype=dtype)
     y_disk = np.linspace(extend * yaxis[0], extend * yaxis[-1],
-                         int(nypix * oversample))
-    x_disk, y_disk = np.meshgrid(x_disk, y_disk)
-    r_disk, t_disk = get_r_t(x_disk, y_disk)
-    return x_disk, y_disk, r_disk, t_disk
+                         int(nypix * oversample), dtype=dtype)
+    r_disk = np.empty((y_disk.size, x_disk.size), dtype=dtype)
+    t_disk = np.empty((y_disk.size, x_disk.size), dtype=dtype)
+    _aot(_diskframe_r_t_kernel, dtype)(x_disk, y_disk, bool(USE_FAST_MATH),
+                                       r_disk, t_disk)
+    return x_disk[None, :], y_disk[:, None], r_disk, t_disk
+
+
+@numba.njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def _diskframe_r_t_kernel(x_disk, y_disk, fast, r_out, t_out):
+    """Polar coordinates on the grid spanned by the 1D ``x_disk``, ``y_disk``."""
+    for i in numba.prange(y_disk.size):
+        y2 = y_disk[i] * y_disk[i]
+        for j in range(x_disk.size):
+            r_out[i, j] = math.sqrt(x_disk[j] * x_disk[j] + y2)
+            t_out[i, j] = _atan2(y_disk[i], x_disk[j], fast)
@@ -1,19 +1,25 @@
 # -*- coding: utf-8 -*-
 
 import os
+import math
 import time
+import multiprocessing
 import emcee
 import pickle
 import numpy as np
+import numba
 from astropy.io import fits
 from astropy.convolution import (convolve, convolve_fft, Gaussian2DKernel, Gaussian1DKernel
 )
 import warnings
+from collections import OrderedDict
 import matplotlib.pyplot as plt
 from scipy.optimize import minimize
+from scipy.fft import rfft2, irfft2, next_fast_len
 from scipy.interpolate import griddata
 import scipy.constants as sc
-from scipy.ndimage import shift, rotate
+from scipy.ndimage import (shift, rotate, affine_transform,
+                           gaussian_filter)
 import matplotlib.colors as mcolors
 import matplotlib.cm as cm
 from mpl_toolkits.axes_grid1.axes_divider import make_axes_locatable
@@ -32,6 +38,74 @@ except ImportError:
 warnings.filterwarnings("ignore")
 
 
+# Per-process state for the workers of ``rotationmap._worker_pool``.
+_WORKER = {}
+
+
+def _worker_init(state):
+    """Unpickle the ``rotationmap``, ``params`` and priors once per worker."""
+    rotmap, params, priors = pickle.loads(state)
+    rotationmap.priors.clear()
+    for param, prior in priors.items():
+        if callable(prior):
+            rotationmap.priors[param] = prior
+        else:
+            type = 'flat' if prior[0] == 0 else 'gaussian'
+            rotmap.set_prior(param, [prior[1], prior[2]], type)
+    _WORKER['rotmap'], _WORKER['params'] = rotmap, params
+
+
+def _worker_ln_probability(theta):
+    """Log-probability function using the worker's ``rotationmap``."""
+    return _WORKER['rotmap']._ln_probability(theta, _WORKER['params'])
+
+
+@numba.njit(cache=True, error_model='numpy')
+def _ln_prior_kernel(theta, idx, fixed, kind, a, b):
+    """Sum of flat (kind 0) and Gaussian (kind 1) log-priors."""
+    lnp = 0.0
+    for i in range(idx.size):
+        p = theta[idx[i]] if idx[i] >= 0 else fixed[i]
+        if kind[i] == 0:
+            if not min(a[i], b[i]) <= p <= max(a[i], b[i]):
+                return -np.inf
+            lnp += math.log(1.0 / (b[i] - a[i]))
+        else:
+            lnp += -0.5 * ((a[i] - p) / b[i])**2
+            lnp -= math.log(math.sqrt(2. * math.pi) * b[i])
+    return lnp
+
+
+@numba.njit(parallel=True, cache=True, error_model='numpy')
+def _calc_ivar_kernel(r, t, data, error, bounds, flags, ivar):
+    """
+    Fill ``ivar`` with ``error**-2`` for the pixels within ``bounds``,
+    ``(r_min, r_max, PA_min, PA_max, v_min, v_max)``, and zero elsewhere. Bits
+    0 to 3 of ``flags`` are ``exclude_r``, ``exclude_PA``, ``exclude_v`` and
+    ``abs_PA``.
+    """
+    exclude_r, exclude_t = (flags & 1) != 0, (flags & 2) != 0
+    exclude_v, abs_t = (flags & 4) != 0, (flags & 8) != 0
+    for i in numba.prange(r.size):
+        tt = abs(t[i]) if abs_t else t[i]
+        ok = ((bounds[0] <= r[i] <= bounds[1]) != exclude_r)
+        ok &= ((bounds[2] <= tt <= bounds[3]) != exclude_t)
+        ok &= ((bounds[4] <= data[i] <= bounds[5]) != exclude_v)
+        ok &= np.isfinite(data[i]) and error[i] > 0.0
+        ivar[i] = 1.0 / (error[i] * error[i]) if ok else 0.0
+
+
+@numba.njit(parallel=True, fastmath=dp._FASTMATH, cache=True,
+            error_model='numpy')
+def _chi2_kernel(model, idx, data, inv_err2, scale):
+    """Weighted sum of ``(scale * model[idx] - data)**2``."""
+    chi2 = 0.0
+    for i in numba.prange(idx.size):
+        resi = scale * model[idx[i]] - data[i]
+        chi2 += resi * resi * inv_err2[i]
+    return chi2
+
+
 class rotationmap:
     """
     Read in the velocity maps and initialize the class. To make the fitting
@@ -69,19 +143,22 @@ class rotationmap:
                  x0=0.0, y0=0.0, unit='m/s', mcmc='emcee'):
         # Read in the data and position axes.
         self.path = path
-        self.data = np.squeeze(fits.getdata(path))
-        self.header = fits.getheader(path)
+        with fits.open(path, memmap=True) as hdulist:
+            self.data = np.squeeze(hdulist[0].data)
+            self.header = hdulist[0].header
 
         if isinstance(uncertainty, np.float):
             self.error = uncertainty * abs((self.data - np.nanmedian(self.data)))
         elif uncertainty is not None:
-            self.error = abs(np.squeeze(fits.getdata(uncertainty)))
+            self.error = fits.getdata(uncertainty, memmap=True)
+            self.error = abs(np.squeeze(self.error))
         else:
             try:
                 uncertainty = '_'.join(self.path.split('_')[:-1])
                 uncertainty += '_d' + self.path.split('_')[-1]
                 print("Assuming uncertainties in {}".format(uncertainty))
-                self.error = abs(np.squeeze(fits.getdata(uncertainty)))
+                self.error = fits.getdata(uncertainty, memmap=True)
+                self.error = abs(np.squeeze(self.error))
             except FileNotFoundError:
                 print("No uncertainties found, assuming uncertainties of 10%.")
                 print("Change this at any time with rotationmap.error.")
@@ -92,10 +169,12 @@ class rotationmap:
 
         # Convert the data to [km/s].
         if unit.lower() == 'm/s':
-            self.data *= 1e-3
-            self.error *= 1e-3
+            self.data = self.data * 1e-3
+            self.error = self.error * 1e-3
         elif unit.lower() != 'km/s':
             raise ValueError("unit must be 'm/s' or 'km/s'.")
+        self.data = self.data.astype(np.float32)
+        self.error = self.error.astype(np.float32)
 
         # Read the position axes.
         self.xaxis = self._read_position_axis(a=1)
@@ -119,7 +198,10 @@ class rotationmap:
             self._clip_cube(FOV / 2.0)
         self.nypix = self.yaxis.size
         self.nxpix = self.xaxis.size
-        self.mask = np.isfinite(self.data)
+
+        # LRU cache of the inverse variances for recent geometries and masks.
+        self._ivar_cache = OrderedDict()
+        self._set_data_masked()
 
         # Estimate the systemic velocity.
         self.vlsr = np.nanmedian(self.data)
@@ -133,6 +215,13 @@ class rotationmap:
         self.shadowed_oversample = 2.0
         self.shadowed_method = 'nearest'
 
+        # Cached FFT of the beam kernel.
+        self._kernel_rfft = None
+
+        # LRU cache of the disk coordinates for recent geometries.
+        self._coord_cache = OrderedDict()
+        self._coord_cache_size = 2
+
         # Get the name of the file
         basename = os.path.basename(self.path)
         self.name = os.path.splitext(basename)[0]
@@ -200,7 +289,10 @@ class rotationmap:
                 ``'samples'``, ``'sampler'``, ``'percentiles'``, ``'dict'``,
                 ``'model'``, ``'residuals'`` or ``'none'``. By default only
                 ``'percentiles'`` are returned.
-            pool (optional): An object with a `map` method.
+            pool (optional): An object with a `map` method. If an integer is
+                given, a pool of that many worker processes is created for
+                the fit, each holding its own copy of the attached data, so
+                that only the walker positions are sent at each step.
             emcee_kwargs (Optional[dict]): Dictionary to pass to the emcee
                 ``EnsembleSampler``.
             niter (optional[int]): Number of iterations to perform using the
@@ -230,8 +322,12 @@ class rotationmap:
             params['r_max'] = r_max
 
         params_tmp = self.verify_params_dictionary(params.copy())
+        self._theta_layout = rotationmap._get_theta_layout(params_tmp)
         self.shadowed = shadowed
 
+        # Refresh the cached pixels in case the data were edited in place.
+        self._set_data_masked()
+
         # Generate the mask for fitting based on the params.
 
         p0 = np.squeeze(p0).astype(float)
@@ -260,39 +356,51 @@ class rotationmap:
         time.sleep(0.5)
         nwalkers = 2 * p0.size if nwalkers is None else nwalkers
         emcee_kwargs = {} if emcee_kwargs is None else emcee_kwargs
+        if isinstance(pool, int) and not isinstance(pool, bool):
+            pool = self._worker_pool(pool, params_tmp)
+            close_pool = True
+        else:
+            close_pool = False
         emcee_kwargs['scatter'], emcee_kwargs['pool'] = scatter, pool
-        for n in range(int(niter)):
+        try:
+            for n in range(int(niter)):
 
-            # Make the mask for fitting.
+                # Make the mask for fitting.
 
-            temp = rotationmap._populate_dictionary(p0, params_tmp)
-            temp = self.verify_params_dictionary(temp)
-            self.ivar = self._calc_ivar(temp)
+                temp = rotationmap._populate_dictionary(p0, params_tmp)
+                temp = self.verify_params_dictionary(temp)
+                self.ivar = self._calc_ivar(temp)
 
-            # Run the sampler.
+                # Run the sampler.
 
-            sampler = self._run_mcmc(p0=p0, params=params_tmp,
-                                     nwalkers=nwalkers, nburnin=nburnin,
-                                     nsteps=nsteps, **emcee_kwargs)
-            if type(params_tmp['PA']) is int:
-                sampler.chain[:, :, params_tmp['PA']] %= 360.0
+                sampler = self._run_mcmc(p0=p0, params=params_tmp,
+                                         nwalkers=nwalkers, nburnin=nburnin,
+                                         nsteps=nsteps, **emcee_kwargs)
+                if type(params_tmp['PA']) is int:
+                    sampler.chain[:, :, params_tmp['PA']] %= 360.0
 
-            # Split off the samples.
+                # Split off the samples.
 
-            if self._mcmc == 'emcee':
-                samples = sampler.chain[:, -int(nsteps):]
-            else:
-                samples = sampler.chain[-int(nsteps):]
-            samples = samples.reshape(-1, samples.shape[-1])
-            p0 = np.median(samples, axis=0)
-            medians = rotationmap._populate_dictionary(p0, params.copy())
-            medians = self.verify_params_dictionary(medians)
-
-            # Get the max likelihood model
-            idx = np.argmin(np.concatenate(sampler.lnprobability.T[nburnin:]))
-            p0 = samples[idx]
-            max_likelihood = rotationmap._populate_dictionary(p0, params)
-            max_likelihood = self.verify_params_dictionary(max_likelihood)
+                samples = sampler.get_chain(discard=int(nburnin), flat=True)
+                mid = samples.shape[0] // 2
+                part = np.partition(samples, [max(mid - 1, 0), mid], axis=0)
+                if samples.shape[0] % 2:
+                    p0 = part[mid]
+                else:
+                    p0 = 0.5 * (part[mid - 1] + part[mid])
+                medians = rotationmap._populate_dictionary(p0, params.copy())
+                medians = self.verify_params_dictionary(medians)
+
+                # Get the max likelihood model
+                idx = np.argmax(sampler.get_log_prob(discard=int(nburnin),
+                                                     flat=True))
+                p0 = samples[idx]
+                max_likelihood = rotationmap._populate_dictionary(p0, params)
+                max_likelihood = self.verify_params_dictionary(max_likelihood)
+        finally:
+            if close_pool:
+                pool.close()
+                pool.join()
 
         # Diagnostic plots.
         if plots is not None:
@@ -389,7 +497,7 @@ class rotationmap:
             if 'model' in returns:
                 to_return += [model]
             if 'residual' in returns:
-                to_return += [self.data * 1e3 - model]
+                to_return += [self._velocity_residual(model)]
 
         self.shadowed = False
         return to_return if len(to_return) > 1 else to_return[0]
@@ -417,6 +525,7 @@ class rotationmap:
             def prior(p):
                 lnp = np.exp(-0.5 * ((args[0] - p) / args[1])**2)
                 return np.log(lnp / np.sqrt(2. * np.pi) / args[1])
+        prior.spec = (0 if type == 'flat' else 1, args[0], args[1])
         rotationmap.priors[param] = prior
 
     def disk_coords(self, x0=0.0, y0=0.0, xaxis=None, yaxis=None, inc=0.0, PA=0.0, z0=0.0, psi=0.0,
@@ -543,7 +652,8 @@ class rotationmap:
             coords = self.get_shadowed_coords(x0, y0, inc, PA, z_func, w_func)
         else:
             coords = dp.get_flared_coords(x0, y0, xaxis, yaxis, inc, PA, z0,
-                                 r_cavity, r_taper, psi, q_taper, w_r, w_i, w_t, self.disk_coords_niter)
+                                 r_cavity, r_taper, psi, q_taper, w_r, w_i, w_t, self.disk_coords_niter,
+                                 dtype=self._coord_dtype)
         if frame == 'cylindrical':
             return coords
         r, t, z = coords
@@ -555,7 +665,8 @@ class rotationmap:
         such that the velocities around the systemic velocity are highlighted.
 
         Args:
-            levels (optional[list]): List of contour levels to use.
+            levels (optional[list]): List of levels whose extrema set the
+                color scale.
             ivar (optional[ndarray]): Inverse variances for each pixel. Will
                 draw a solid contour around the regions with finite ``ivar``
                 values and fill regions not considered.
@@ -570,9 +681,11 @@ class rotationmap:
             levels = np.nanpercentile(self.data, [2, 98]) - self.vlsr
             levels = max(abs(levels[0]), abs(levels[1]))
             levels = self.vlsr + np.linspace(-levels, levels, 30)
-        im = ax.contourf(self.xaxis, self.yaxis, self.data, levels,
-                         cmap=rotationmap.colormap(), extend='both', zorder=-9)
-        cb = plt.colorbar(im, pad=0.03, format='%.2f')
+        im = ax.pcolormesh(self.xaxis, self.yaxis, self.data,
+                           vmin=np.min(levels), vmax=np.max(levels),
+                           cmap=rotationmap.colormap(), shading='nearest',
+                           zorder=-9)
+        cb = plt.colorbar(im, pad=0.03, format='%.2f', extend='both')
         cb.minorticks_on()
         cb.set_label(r'${\rm v_{0} \quad (km\,s^{-1})}$',
                      rotation=270, labelpad=15)
@@ -601,13 +714,25 @@ class rotationmap:
         def nlnL(theta):
             return -self._ln_probability(theta, params)
 
-        method = kwargs.pop('method', 'TNC')
+        # The chi-squared is large and L-BFGS-B's ``ftol`` is relative, so its
+        # stopping criteria must be much tighter than TNC's absolute ``ftol``.
+        method = kwargs.pop('method', 'L-BFGS-B')
         options = kwargs.pop('options', {})
         options['maxiter'] = options.pop('maxiter', 10000)
-        options['maxfun'] = options.pop('maxfun', 10000)
-        options['ftol'] = options.pop('ftol', 1e-3)
+        if method.upper() in ['L-BFGS-B', 'TNC']:
+            options['maxfun'] = options.pop('maxfun', 10000)
+        if method.upper() == 'L-BFGS-B':
+            options['ftol'] = options.pop('ftol', 1e-10)
+            options['gtol'] = options.pop('gtol', 1e-6)
+        else:
+            options['ftol'] = options.pop('ftol', 1e-3)
 
-        res = minimize(nlnL, x0=theta, method=method, options=options)
+        # A float32 model is too coarse for finite-difference gradients.
+        self._coord_dtype = np.float64
+        try:
+            res = minimize(nlnL, x0=theta, method=method, options=options)
+        finally:
+            del self._coord_dtype
         if res.success:
             theta = res.x
             print("Optimized starting positions:")
@@ -620,21 +745,28 @@ class rotationmap:
     def _run_mcmc(self, p0, params, nwalkers, nburnin, nsteps, **kwargs):
         """Run the MCMC sampling. Returns the sampler."""
 
-        if self._mcmc == 'zeus':
-            EnsembleSampler = zeus.EnsembleSampler
-        else:
-            EnsembleSampler = emcee.EnsembleSampler
-
         p0 = self._random_p0(p0, kwargs.pop('scatter', 1e-3), nwalkers)
         moves = kwargs.pop('moves', None)
         pool = kwargs.pop('pool', None)
 
-        sampler = EnsembleSampler(nwalkers,
-                                  p0.shape[1],
-                                  self._ln_probability,
-                                  args=[params, np.nan],
-                                  moves=moves,
-                                  pool=pool)
+        if getattr(pool, '_rotationmap_workers', False):
+            ln_probability, args = _worker_ln_probability, []
+        else:
+            ln_probability, args = self._ln_probability, [params, np.nan]
+        if self._mcmc == 'zeus':
+            sampler = zeus.EnsembleSampler(nwalkers,
+                                           p0.shape[1],
+                                           ln_probability,
+                                           args=args,
+                                           moves=moves,
+                                           pool=pool)
+        else:
+            sampler = emcee.EnsembleSampler(nwalkers,
+                                            p0.shape[1],
+                                            ln_probability,
+                                            args=args,
+                                            moves=moves,
+                                            pool=pool)
 
         progress = kwargs.pop('progress', True)
 
@@ -650,23 +782,44 @@ class rotationmap:
         dp0 = np.where(p0 == 0.0, 1.0, p0)[None, :] * (1.0 + scatter * dp0)
         return np.where(p0[None, :] == 0.0, dp0 - 1.0, dp0)
 
-    def _ln_likelihood(self, params):
+    def _worker_pool(self, processes, params):
+        """
+        Return a ``multiprocessing.Pool`` whose workers each unpickle this
+        ``rotationmap``, ``params`` and the priors once, rather than receiving
+        them with every task. Priors made by ``set_prior`` are rebuilt from
+        their ``spec``, any others must be picklable. The workers are spawned
+        rather than forked, as forking after numba's threading layer has
+        started is unsafe.
+        """
+        priors = {param: getattr(prior, 'spec', prior)
+                  for param, prior in rotationmap.priors.items()}
+        try:
+            state = pickle.dumps((self, params, priors))
+        except (pickle.PicklingError, AttributeError, TypeError) as err:
+            raise ValueError("Could not send the rotationmap and its priors "
+                             "to the pool of workers: {}".format(err))
+        context = multiprocessing.get_context('spawn')
+        pool = context.Pool(processes=processes, initializer=_worker_init,
+                            initargs=(state,))
+        pool._rotationmap_workers = True
+        return pool
+
+    def _ln_likelihood(self, params, make_model=None):
         """Log-likelihood function. Simple chi-squared likelihood."""
-        model = self._make_model(params) * 1e-3
-        # print('model sum', np.sum(model))
-        lnx2 = np.where(self.mask, np.power((self.data - model), 2), 0.0)
-        # print('lnx2',lnx2)
-        # print('sum(lnx2)', np.sum(lnx2))
-        lnx2 = -0.5 * np.sum(lnx2) # * self.ivar)
+        make_model = self._make_model if make_model is None else make_model
+        model = make_model(params)
+        lnx2 = -0.5 * _chi2_kernel(model.ravel(), self._mask_idx,
+                                   self._data_flat_masked,
+                                   self._inv_err2_masked, 1e-3)
         return lnx2 if np.isfinite(lnx2) else -np.inf
 
     def _ln_probability(self, theta, *params_in):
         """Log-probablility function."""
-        model = rotationmap._populate_dictionary(theta, params_in[0])
-        lnp = self._ln_prior(model)
-        # print('lnp', lnp)
+        lnp = self._ln_prior(theta, params_in[0])
         if np.isfinite(lnp):
-            return lnp + self._ln_likelihood(model)
+            model = self._theta_to_params(theta, params_in[0])
+            make_model = self._get_model_function(params_in[0])
+            return lnp + self._ln_likelihood(model, make_model)
         return -np.inf
 
     def _set_default_priors(self):
@@ -701,78 +854,167 @@ class rotationmap:
         self.set_prior('vr_100', [-1e3, 1e3], 'flat')
         self.set_prior('vr_q', [-2.0, 2.0], 'flat')
 
-    def _ln_prior(self, params):
-        """Log-priors."""
-        lnp = 0.0
+    def _prior_arrays(self, params):
+        """
+        Flatten the priors for the parameters in ``params`` into arrays for
+        ``_ln_prior_kernel``. Free parameters point to their index in theta,
+        fixed parameters carry their value. Priors added without a ``spec``
+        attribute are returned separately and evaluated in Python.
+        """
+        cache = getattr(self, '_prior_cache', None)
+        if cache is not None and cache[0] is params:
+            if cache[1] == rotationmap.priors:
+                return cache[2]
+        idx, fixed, kind, a, b, custom = [], [], [], [], [], []
         for key in params.keys():
-            if key in rotationmap.priors.keys():
-                lnp += rotationmap.priors[key](params[key])
-                # print('key', key, params[key])
-                # print('lnp', lnp)
-                if not np.isfinite(lnp):
-                    return lnp
+            prior = rotationmap.priors.get(key)
+            if prior is None:
+                continue
+            spec = getattr(prior, 'spec', None)
+            if spec is None:
+                custom += [key]
+                continue
+            value = params[key]
+            is_idx = isinstance(value, int) and not isinstance(value, bool)
+            idx += [value if is_idx else -1]
+            fixed += [np.nan if is_idx else float(value)]
+            kind += [spec[0]]
+            a += [spec[1]]
+            b += [spec[2]]
+        arrays = (np.array(idx, dtype=np.int64), np.array(fixed, dtype=float),
+                  np.array(kind, dtype=np.int64), np.array(a, dtype=float),
+                  np.array(b, dtype=float), custom)
+        self._prior_cache = (params, rotationmap.priors.copy(), arrays)
+        return arrays
+
+    def _ln_prior(self, theta, params):
+        """Log-priors."""
+        arrays = self._prior_arrays(params)
+        theta = np.asarray(theta, dtype=float)
+        lnp = _ln_prior_kernel(theta, *arrays[:-1])
+        if arrays[-1] and np.isfinite(lnp):
+            model = rotationmap._populate_dictionary(theta, params)
+            for key in arrays[-1]:
+                lnp += rotationmap.priors[key](model[key])
         return lnp
 
     def _calc_ivar(self, params):
         """Calculate the inverse variance including radius mask."""
 
-        # Check the error array is the same shape as the data.
+        # Refresh the cached pixels if the data or uncertainties were replaced.
+        if self._masked_data is not self.data:
+            self._set_data_masked()
+        elif self._inv_err2_error is not self.error:
+            self._set_inv_err2_masked()
+
+        # Reuse the inverse variances if neither geometry nor mask changed.
+        key = tuple(None if params.get(k) is None else round(params[k], 9)
+                    for k in self._geometry_keys + self._mask_keys)
+        key += (self.shadowed, self.disk_coords_niter)
         try:
-            assert self.error.shape == self.data.shape
-        except AttributeError:
-            self.error = self.error * np.ones(self.data.shape)
+            ivar = self._ivar_cache.pop(key)
+        except KeyError:
+            ivar = self._calc_ivar_uncached(params)
+            while len(self._ivar_cache) >= self._ivar_cache_size:
+                self._ivar_cache.popitem(last=False)
+        self._ivar_cache[key] = ivar
+        return ivar
+
+    def _set_data_masked(self):
+        """Cache the finite pixels of the data for ``_ln_likelihood``."""
+        self.mask = np.isfinite(self.data)
+        self._mask_idx = np.flatnonzero(self.mask)
+        self._data_flat_masked = self.data.ravel()[self._mask_idx]
+        self._masked_data = self.data
+        self._set_inv_err2_masked()
+
+    def _set_inv_err2_masked(self):
+        """Cache ``error**-2`` of the finite pixels for ``_ln_likelihood``."""
+
+        # Broadcast a scalar uncertainty, e.g. ``rotationmap.error = 0.1``.
+        if np.ndim(self.error) == 0:
+            self.error = np.full(self.data.shape, self.error, dtype=np.float32)
+        elif np.shape(self.error) != self.data.shape:
+            raise ValueError("error must be a scalar or match the data shape "
+                             "{}.".format(self.data.shape))
+        inv_err2 = np.zeros(self.data.shape, dtype=np.float32)
+        good = np.isfinite(self.error) & (self.error > 0.0)
+        inv_err2[good] = 1.0 / np.square(self.error[good])
+        self._inv_err2_masked = inv_err2.ravel()[self._mask_idx]
+        self._inv_err2_error = self.error
+        self._ivar_cache.clear()
+
+    _mask_keys = ['r_min', 'r_max', 'PA_min', 'PA_max', 'v_min', 'v_max',
+                  'exclude_r', 'exclude_PA', 'exclude_v', 'abs_PA']
+    _ivar_cache_size = 8
+
+    def _calc_ivar_uncached(self, params):
+        """Calculate the inverse variance for ``_calc_ivar``."""
 
         # Deprojected coordinates.
-        r, t = self.disk_coords(**params)[:2]
-        t = abs(t) if params['abs_PA'] else t
-
-        # Radial mask.
-        mask_r = np.logical_and(r >= params['r_min'], r <= params['r_max'])
-        mask_r = ~mask_r if params['exclude_r'] else mask_r
-
-        # Azimuthal mask.
-        mask_t = np.logical_and(t >= params['PA_min'], t <= params['PA_max'])
-        mask_t = ~mask_t if params['exclude_PA'] else mask_t
-
-        # Finite value mask.
-        mask_f = np.logical_and(np.isfinite(self.data), self.error > 0.0)
-
-        # Velocity mask.
-        v_min, v_max = params['v_min'], params['v_max']
-        mask_v = np.logical_and(self.data >= v_min, self.data <= v_max)
-        mask_v = ~mask_v if params['exclude_v'] else mask_v
-
-        # Combine.
-        mask = np.logical_and(np.logical_and(mask_v, mask_f),
-                              np.logical_and(mask_r, mask_t))
-        return np.where(mask, np.power(self.error, -2.0), 0.0)
+        r, t = self._cached_disk_coords(params)[:2]
+
+        # Radial, azimuthal, velocity and finite value masks in one pass.
+        bounds = np.array([params['r_min'], params['r_max'],
+                           params['PA_min'], params['PA_max'],
+                           params['v_min'], params['v_max']], dtype=float)
+        flags = (int(bool(params['exclude_r'])) |
+                 int(bool(params['exclude_PA'])) << 1 |
+                 int(bool(params['exclude_v'])) << 2 |
+                 int(bool(params['abs_PA'])) << 3)
+        ivar = np.empty(self.data.shape, dtype=self.error.dtype)
+        _calc_ivar_kernel(np.ascontiguousarray(r).ravel(),
+                          np.ascontiguousarray(t).ravel(),
+                          np.ascontiguousarray(self.data).ravel(),
+                          np.ascontiguousarray(self.error).ravel(),
+                          bounds, flags, ivar.ravel())
+        return ivar
 
     @staticmethod
     def _get_labels(params):
         """Return the labels of the parameters to fit."""
         idxs, labs = [], []
-        for k in params.keys():
-            if isinstance(params[k], int):
-                if not isinstance(params[k], bool):
-                    idxs.append(params[k])
-                    try:
-                        idx = k.index('_') + 1
-                        label = k[:idx] + '{{' + k[idx:] + '}}'
-                    except ValueError:
-                        label = k
-                    label = r'${{\rm {}}}$'.format(label)
-                    labs.append(label)
+        for k, i in rotationmap._get_theta_layout(params)[1]:
+            idxs.append(i)
+            try:
+                idx = k.index('_') + 1
+                label = k[:idx] + '{{' + k[idx:] + '}}'
+            except ValueError:
+                label = k
+            label = r'${{\rm {}}}$'.format(label)
+            labs.append(label)
         return np.array(labs)[np.argsort(idxs)]
 
+    @staticmethod
+    def _get_theta_layout(params):
+        """Return ``params`` and the ``(key, index)`` of its free parameters."""
+        free = [(key, value) for key, value in params.items()
+                if isinstance(value, int) and not isinstance(value, bool)]
+        return params, free
+
+    def _theta_to_params(self, theta, params):
+        """
+        Populate ``params`` from ``theta``, using the layout from ``fit_map``
+        if it was built for this dictionary.
+        """
+        layout = getattr(self, '_theta_layout', None)
+        if layout is None or layout[0] is not params:
+            return rotationmap._populate_dictionary(theta, params)
+        return rotationmap._populate_from_layout(theta, params, layout[1])
+
+    @staticmethod
+    def _populate_from_layout(theta, params, free):
+        """Populate ``params`` from the ``(key, index)`` pairs in ``free``."""
+        model = params.copy()
+        for key, idx in free:
+            model[key] = theta[idx]
+        return model
+
     @staticmethod
     def _populate_dictionary(theta, dictionary_in):
         """Populate the dictionary of free parameters."""
-        dictionary = dictionary_in.copy()
-        for key in dictionary.keys():
-            if isinstance(dictionary[key], int):
-                if not isinstance(dictionary[key], bool):
-                    dictionary[key] = theta[dictionary[key]]
-        return dictionary
+        free = rotationmap._get_theta_layout(dictionary_in)[1]
+        return rotationmap._populate_from_layout(theta, dictionary_in, free)
 
     def verify_params_dictionary(self, params):
         """
@@ -898,7 +1140,7 @@ class rotationmap:
         """
 
         # Check the input.
-        nparam = np.sum([isinstance(params[k], int) for k in params.keys()])
+        nparam = len(rotationmap._get_theta_layout(params)[1])
         if samples.shape[1] != nparam:
             warning = "Invalid number of free parameters in 'samples': {:d}."
             raise ValueError(warning.format(nparam))
@@ -909,13 +1151,21 @@ class rotationmap:
         # Avearge over a random draw of models.
 
         if isinstance(int(draws) if draws > 1.0 else draws, int):
-            models = []
-            for idx in np.random.randint(0, samples.shape[0], draws):
-                tmp = self._populate_dictionary(samples[idx], verified_params)
+            make_model = self._get_model_function(verified_params)
+            free = rotationmap._get_theta_layout(verified_params)[1]
+            idxs = np.random.randint(0, samples.shape[0], int(draws))
+            models, tmp = None, verified_params.copy()
+            for i, idx in enumerate(idxs):
+                for key, j in free:
+                    tmp[key] = samples[idx, j]
                 if coords_only:
-                    models += [self.disk_coords(**tmp)]
+                    model = np.asarray(self._cached_disk_coords(tmp))
                 else:
-                    models += [self._make_model(tmp)]
+                    model = make_model(tmp)
+                if models is None:
+                    models = np.empty((idxs.size,) + model.shape,
+                                      dtype=model.dtype)
+                models[i] = model
             return collapse_func(models, axis=0)
 
         # Take a percentile of the samples.
@@ -963,7 +1213,8 @@ class rotationmap:
         # Calculate the image to mirror.
 
         if mirror_velocity_residual:
-            to_mirror = self.data * 1e3 - self.evaluate_models(samples, params)
+            to_mirror = self.evaluate_models(samples, params)
+            to_mirror = self._velocity_residual(to_mirror)
         else:
             to_mirror = self.data.copy() * 1e3
             if isinstance(type(params['vlsr']), int):
@@ -1001,17 +1252,11 @@ class rotationmap:
 
         # Reproject the residuals onto the sky plane.
 
-        dd = d.flatten()
-        mask = np.isfinite(dd)
-        xx, yy = np.meshgrid(x, x)
-        xx, yy = xx.flatten(), yy.flatten()
-        xx, yy, dd = xx[mask], yy[mask], dd[mask]
+        from scipy.interpolate import RegularGridInterpolator
 
-        from scipy.interpolate import interp2d
-
-        f = interp2d(xx, yy, dd, kind='linear')
-        f = np.squeeze([f(xd, yd) for xd, yd in zip(xs, ys)])
-        f = f.reshape(to_mirror.shape)
+        f = RegularGridInterpolator((x, x), d, method='linear',
+                                    bounds_error=False, fill_value=np.nan)
+        f = f(np.column_stack([ys, xs])).reshape(to_mirror.shape)
         f = np.where(np.isfinite(to_mirror), f, np.nan)
 
         return self.xaxis, self.yaxis, f
@@ -1031,7 +1276,7 @@ class rotationmap:
         Returns:
             vproj (ndarray): Projected Keplerian rotation at each pixel (m/s).
         """
-        rvals, tvals, zvals = self.disk_coords(**params)
+        rvals, tvals, zvals = self._cached_disk_coords(params)
 
         if params['vfunc'] == 'proj_vkep':
             # print(rvals, tvals, zvals, params['dist'], params['mstar'], params['inc'])
@@ -1040,9 +1285,39 @@ class rotationmap:
         else:
             # roj_vpow(rvals, tvals, zvals, dist, mstar, vp_q, vp_100, vp_qtaper, vp_rtaper):
             v_phi = mod.proj_vpow(rvals, tvals, zvals, params['dist'], params['mstar'], params['inc'],
-                                params['vp_q'], params['vp_100'], params['vp_qtaper'], params['vp_rtaper'])
+                                params['vp_q'], params['vp_100'], params['vp_qtaper'], params['vp_rtaper'],
+                                params['vr_q'], params['vr_100'])
         return v_phi + params['vlsr']
 
+    _geometry_keys = ['x0', 'y0', 'inc', 'PA', 'z0', 'psi', 'r_cavity',
+                      'r_taper', 'q_taper', 'w_i', 'w_r', 'w_t']
+    _coord_dtype = np.float32
+
+    def _cached_disk_coords(self, params):
+        """Return ``disk_coords(**params)``, reusing recent geometries."""
+        if params.get('xaxis') is not None or params.get('yaxis') is not None:
+            return self.disk_coords(**params)
+        key = tuple(None if params.get(k) is None else round(params[k], 9)
+                    for k in self._geometry_keys)
+        key += (self.shadowed, self.disk_coords_niter, self._coord_dtype)
+        try:
+            coords = self._coord_cache.pop(key)
+        except KeyError:
+            coords = self.disk_coords(**params)
+            while len(self._coord_cache) >= max(1, self._coord_cache_size):
+                self._coord_cache.popitem(last=False)
+        self._coord_cache[key] = coords
+        return coords
+
+    def __getstate__(self):
+        """Drop the caches and closures when pickling for a pool."""
+        state = self.__dict__.copy()
+        state['_coord_cache'] = OrderedDict()
+        state['_ivar_cache'] = OrderedDict()
+        state.pop('_model_function', None)
+        state.pop('_prior_cache', None)
+        return state
+
     def get_shadowed_coords(self, x0, y0, inc, PA, z_func, w_func):
         """Return cyclindrical coords of surface in [arcsec, rad, arcsec]."""
 
@@ -1056,9 +1331,9 @@ class rotationmap:
         zdisk = z_func(rdisk) + w_func(rdisk, tdisk)
 
         # Incline the disk.
-        inc = np.radians(inc)
+        inc = math.radians(inc)
         x_dep = xdisk
-        y_dep = ydisk * np.cos(inc) - zdisk * np.sin(inc)
+        y_dep = ydisk * math.cos(inc) - zdisk * math.sin(inc)
 
         # Remove shadowed pixels.
         if inc < 0.0:
@@ -1073,10 +1348,9 @@ class rotationmap:
         # Grid the disk.
         disk = (x_rot.flatten(), y_rot.flatten())
         grid = (self.xaxis[None, :], self.yaxis[:, None])
-        r_obs = griddata(disk, rdisk.flatten(), grid,
-                         method=self.shadowed_method)
-        t_obs = griddata(disk, tdisk.flatten(), grid,
-                         method=self.shadowed_method)
+        obs = np.stack([rdisk.ravel(), tdisk.ravel()], axis=-1)
+        obs = griddata(disk, obs, grid, method=self.shadowed_method)
+        r_obs, t_obs = obs[..., 0], obs[..., 1]
         return r_obs, t_obs, z_func(r_obs)
 
     # -- Functions to build projected velocity profiles. -- #
@@ -1085,9 +1359,51 @@ class rotationmap:
         """Build the velocity model from the dictionary of parameters."""
         v_phi = self.vphi(params)
         if params['beam']:
-            v_phi = rotationmap._convolve_image(v_phi, self._beamkernel())
+            v_phi = self._convolve_beam(v_phi)
         return v_phi
 
+    def _velocity_residual(self, model):
+        """Return ``data * 1e3 - model`` in [m/s] with a single allocation."""
+        vres = np.multiply(self.data, 1e3,
+                           dtype=np.result_type(self.data, model))
+        vres -= model
+        return vres
+
+    def _get_model_function(self, params):
+        """
+        Return a ``_make_model`` specialized for dictionaries populated from
+        ``params``. The velocity profile, its arguments and the beam
+        convolution cannot be free parameters, so they are resolved once.
+        The returned model is written into a buffer reused between calls, so
+        it must be consumed or copied before the next call.
+        """
+        cache = getattr(self, '_model_function', None)
+        if cache is not None and cache[0] is params:
+            return cache[1]
+        if params['vfunc'] == 'proj_vkep':
+            vfunc, keys = mod.proj_vkep, ['dist', 'mstar', 'inc']
+        else:
+            vfunc, keys = mod.proj_vpow, ['dist', 'mstar', 'inc', 'vp_q',
+                                          'vp_100', 'vp_qtaper', 'vp_rtaper',
+                                          'vr_q', 'vr_100']
+        convolve = self._convolve_beam if params['beam'] else None
+        buffer = [None]
+
+        def make_model(params):
+            rvals, tvals, zvals = self._cached_disk_coords(params)
+            out = buffer[0]
+            if (out is None or out.shape != rvals.shape
+                    or out.dtype != np.result_type(rvals, np.float32)):
+                out = np.empty(rvals.shape, np.result_type(rvals, np.float32))
+                buffer[0] = out
+            v_phi = vfunc(rvals, tvals, zvals, *[params[k] for k in keys],
+                          out=out)
+            v_phi += params['vlsr']
+            return v_phi if convolve is None else convolve(v_phi)
+
+        self._model_function = (params, make_model)
+        return make_model
+
     # -- Functions to help determine the emission height. -- #
 
     def find_maxima(self, x0=0.0, y0=0.0, PA=0.0, vlsr=None, r_max=None,
@@ -1122,18 +1438,19 @@ class rotationmap:
         r_min = 0.0 if r_min is None else r_min
 
         # Shift and rotate the image.
-        data = self._shift_center(dx=x0, dy=y0, save=False)
-        data = self._rotate_image(PA=PA, data=data, save=False)
+        data = self._shift_rotate_image(dx=x0, dy=y0, PA=PA)
 
         # Find the maximum values. Apply some clipping to help.
-        mask = np.maximum(0.3 * abs(self.xaxis), self.bmaj)
-        mask = abs(self.yaxis)[:, None] > mask[None, :]
-        resi = np.where(mask, 0.0, abs(data - vlsr))
+        absx, absy = abs(self.xaxis), abs(self.yaxis)
+        mask = np.maximum(0.3 * absx, self.bmaj)
+        mask = absy[:, None] > mask[None, :]
+        resi = np.abs(np.subtract(data, vlsr, out=data), out=data)
+        resi[mask] = 0.0
         resi = np.take(self.yaxis, np.argmax(resi, axis=0))
 
         # Gentrification.
         if through_center:
-            resi[abs(self.xaxis).argmin()] = 0.0
+            resi[absx.argmin()] = 0.0
         if smooth:
             if isinstance(smooth, bool):
                 kernel = np.hanning(self.bmaj / self.dpix)
@@ -1141,8 +1458,7 @@ class rotationmap:
             else:
                 kernel = Gaussian1DKernel(smooth / self.fwhm / self.dpix)
             resi = np.convolve(resi, kernel, mode='same')
-        mask = np.logical_and(abs(self.xaxis) <= r_max,
-                              abs(self.xaxis) >= r_min)
+        mask = np.logical_and(absx <= r_max, absx >= r_min)
         x, y = self.xaxis[mask], resi[mask]
 
         # Rotate back to sky-plane and return.
@@ -1181,18 +1497,19 @@ class rotationmap:
         r_min = 0.0 if r_min is None else r_min
 
         # Shift and rotate the image.
-        data = self._shift_center(dx=x0, dy=y0, save=False)
-        data = self._rotate_image(PA=PA, data=data, save=False)
+        data = self._shift_rotate_image(dx=x0, dy=y0, PA=PA)
 
         # Find the maximum values. Apply some clipping to help.
-        mask = np.maximum(0.3 * abs(self.yaxis), self.bmaj)
-        mask = abs(self.xaxis)[None, :] > mask[:, None]
-        resi = np.where(mask, 1e10, abs(data - vlsr))
+        absx, absy = abs(self.xaxis), abs(self.yaxis)
+        mask = np.maximum(0.3 * absy, self.bmaj)
+        mask = absx[None, :] > mask[:, None]
+        resi = np.abs(np.subtract(data, vlsr, out=data), out=data)
+        resi[mask] = 1e10
         resi = np.take(-self.yaxis, np.argmin(resi, axis=1))
 
         # Gentrification.
         if through_center:
-            resi[abs(self.yaxis).argmin()] = 0.0
+            resi[absy.argmin()] = 0.0
         if smooth:
             if isinstance(smooth, bool):
                 kernel = np.hanning(self.bmaj / self.dpix)
@@ -1200,8 +1517,7 @@ class rotationmap:
             else:
                 kernel = Gaussian1DKernel(smooth / self.fwhm / self.dpix)
             resi = np.convolve(resi, kernel, mode='same')
-        mask = np.logical_and(abs(self.yaxis) <= r_max,
-                              abs(self.yaxis) >= r_min)
+        mask = np.logical_and(absy <= r_max, absy >= r_min)
         x, y = resi[mask], self.yaxis[mask]
 
         # Rotate back to sky-plane and return.
@@ -1294,9 +1610,31 @@ class rotationmap:
         N0 = int(N / 2)
         self.xaxis = self.xaxis[N0::N]
         self.yaxis = self.yaxis[N0::N]
-        self.data = self.data[N0::N, N0::N]
+        self.data = rotationmap._lowpass_image(self.data, N)[N0::N, N0::N]
         self.error = self.error[N0::N, N0::N]
 
+    @staticmethod
+    def _lowpass_image(image, N):
+        """
+        Smooth the image with a Gaussian with a FWHM of ``N`` pixels to
+        suppress the aliasing when it is decimated every ``N`` pixels. NaNs
+        are excluded by normalizing with the smoothed weights and are restored
+        afterwards.
+        """
+        nans = ~np.isfinite(image)
+        if nans.all():
+            return image
+        sigma = N / rotationmap.fwhm
+        lowpass = gaussian_filter(np.where(nans, 0.0, image), sigma,
+                                  mode='nearest')
+        if nans.any():
+            weights = gaussian_filter((~nans).astype(float), sigma,
+                                      mode='nearest')
+            lowpass /= np.where(weights > 0.0, weights, np.nan)
+        lowpass = lowpass.astype(image.dtype)
+        lowpass[nans] = np.nan
+        return lowpass
+
     def _read_position_axis(self, a=1):
         """Returns the position axis in [arcseconds]."""
         if a not in [1, 2]:
@@ -1343,6 +1681,30 @@ class rotationmap:
             self.data = data
         return data
 
+    def _shift_rotate_image(self, dx=0.0, dy=0.0, PA=90.0, data=None):
+        """
+        Shift the center of the image and then rotate it anticlockwise about
+        the center, as ``_shift_center`` followed by ``_rotate_image``, but
+        with a single spline interpolation. Never overwrites the data.
+
+        Args:
+            dx (optional[float]): shift along x-axis [arcsec].
+            dy (optional[float]): Shift along y-axis [arcsec].
+            PA (optional[float]): Rotation angle in [degrees].
+            data (optional[ndarray]): Data to transform. If nothing is
+                provided, will use the attached ``rotationmap.data``.
+        """
+
+        data = self.data if data is None else data
+        to_transform = np.where(np.isfinite(data), data, 0.0)
+        angle = math.radians(PA - 90.0)
+        c, s = math.cos(angle), math.sin(angle)
+        matrix = np.array([[c, s], [-s, c]])
+        center = 0.5 * (np.array(to_transform.shape) - 1.0)
+        offset = center - matrix @ center
+        offset -= np.array([-dy / self.dpix, dx / self.dpix])
+        return affine_transform(to_transform, matrix, offset=offset)
+
     # -- Convolution functions. -- #
 
     def _readbeam(self):
@@ -1380,6 +1742,35 @@ class rotationmap:
             return convolve_fft(image, kernel, preserve_nan=True)
         return convolve(image, kernel, preserve_nan=True)
 
+    def _convolve_beam(self, image):
+        """
+        Convolve the image with the beam. Matches ``_convolve_image`` with the
+        ``convolve_fft`` defaults, but keeps the real FFT of the normalized
+        beam kernel between calls as the beam does not change during a fit.
+        """
+        key = (self.bmaj, self.bmin, self.bpa, self.dpix, image.shape)
+        if self._kernel_rfft is None or self._kernel_rfft[0] != key:
+            kernel = self._beamkernel().array
+            kernel = kernel / kernel.sum()
+            shape = (next_fast_len(image.shape[0] + kernel.shape[0] - 1, True),
+                     next_fast_len(image.shape[1] + kernel.shape[1] - 1, True))
+            slices = tuple(slice(k // 2, k // 2 + n)
+                           for k, n in zip(kernel.shape, image.shape))
+            self._kernel_rfft = (key, rfft2(kernel, s=shape), shape, slices)
+        _, kernel_rfft, shape, slices = self._kernel_rfft
+
+        def _convolve(a):
+            return irfft2(rfft2(a, s=shape) * kernel_rfft, s=shape)[slices]
+
+        # Interpolate over NaNs by renormalizing with the convolved weights.
+        nans = ~np.isfinite(image)
+        if not nans.any():
+            return _convolve(image)
+        convolved = _convolve(np.where(nans, 0.0, image))
+        convolved /= 1.0 - _convolve(nans.astype(float))
+        convolved[nans] = np.nan
+        return convolved
+
     # -- Plotting functions. -- #
 
     @staticmethod
@@ -1441,55 +1832,55 @@ class rotationmap:
             return fig
 
     def _plot_bestfit(self, params, ivar=None, residual=False,
-                      return_ax=False, save_name=None):
-        """Plot the best-fit model."""
-        ax = plt.subplots()[1]
+                      return_ax=False, save_name=None, ax=None):
+        """Plot the best-fit model, onto ``ax`` if provided."""
+        ax = plt.subplots()[1] if ax is None else ax
         vkep = self._make_model(params) * 1e-3
-        levels = np.nanpercentile(vkep, [2, 98])
-        levels = np.linspace(levels[0], levels[1], 30)
-        im = ax.contourf(self.xaxis, self.yaxis, vkep, levels,
-                         cmap=rotationmap.colormap(), extend='both')
+        vmin, vmax = np.nanpercentile(vkep, [2, 98])
+        im = ax.pcolormesh(self.xaxis, self.yaxis, vkep, vmin=vmin, vmax=vmax,
+                           cmap=rotationmap.colormap(), shading='nearest')
         if ivar is not None:
             ax.contour(self.xaxis, self.yaxis, ivar,
                        [0.0], colors='k')
             ax.contourf(self.xaxis, self.yaxis, ivar,
                         [-1.0, 0.0], colors='k', alpha=0.5)
-        cb = plt.colorbar(im, pad=0.02, format='%.2f')
+        cb = ax.figure.colorbar(im, pad=0.02, format='%.2f', ax=ax,
+                                extend='both')
         cb.set_label(r'${\rm v_{mod} \quad (km\,s^{-1})}$',
                      rotation=270, labelpad=15)
         cb.minorticks_on()
         self._gentrify_plot(ax)
 
         if save_name is not None:
-            plt.savefig('{0}_best_fit.png'.format(save_name), dpi=300)
+            ax.figure.savefig('{0}_best_fit.png'.format(save_name), dpi=300)
 
         if return_ax:
             return ax
 
-    def _plot_residual(self, params, ivar=None, return_ax=False, save_name=None):
-        """Plot the residual from the provided model."""
-
-        ax = plt.subplots()[1]
-        vres = self.data * 1e3 - self._make_model(params)
-        levels = np.where(self.ivar != 0.0, vres, np.nan)
-        levels = np.nanpercentile(levels, [2, 98])
-        levels = max(abs(levels[0]), abs(levels[1]))
-        levels = np.linspace(-levels, levels, 30)
-        im = ax.contourf(self.xaxis, self.yaxis, vres, levels,
-                         cmap=cm.RdBu_r, extend='both')
+    def _plot_residual(self, params, ivar=None, return_ax=False, save_name=None,
+                       ax=None):
+        """Plot the residual from the provided model, onto ``ax`` if provided."""
+
+        ax = plt.subplots()[1] if ax is None else ax
+        vres = self._velocity_residual(self._make_model(params))
+        vmax = np.nanpercentile(vres[self.ivar != 0.0], [2, 98])
+        vmax = max(abs(vmax[0]), abs(vmax[1]))
+        im = ax.pcolormesh(self.xaxis, self.yaxis, vres, vmin=-vmax, vmax=vmax,
+                           cmap=cm.RdBu_r, shading='nearest')
         if ivar is not None:
             ax.contour(self.xaxis, self.yaxis, ivar,
                        [0.0], colors='k')
             ax.contourf(self.xaxis, self.yaxis, ivar,
                         [-1.0, 0.0], colors='k', alpha=0.5)
-        cb = plt.colorbar(im, pad=0.02, format='%d', ax=ax)
+        cb = ax.figure.colorbar(im, pad=0.02, format='%d', ax=ax,
+                                extend='both')
         cb.set_label(r'${\rm  v_{0} - v_{mod} \quad (m\,s^{-1})}$',
                      rotation=270, labelpad=15)
         cb.minorticks_on()
         self._gentrify_plot(ax)
 
         if save_name is not None:
-            plt.savefig('{0}_residuals.png'.format(save_name), dpi=300)
+            ax.figure.savefig('{0}_residuals.png'.format(save_name), dpi=300)
 
         if return_ax:
             return ax
@@ -1539,40 +1930,42 @@ class rotationmap:
         rf, tf, zf = self.disk_coords(x0=x0, y0=y0, inc=inc, PA=PA, z0=z0,
                                       psi=psi, r_cavity=r_cavity,
                                       r_taper=r_taper, q_taper=q_taper)
-        mf = np.logical_and(zf >= 0.0, np.isfinite(self.data))
-        rf = np.where(mf, rf, np.nan)
-        tf = np.where(mf, tf, np.nan)
+        finite = np.isfinite(self.data)
+        mf = zf >= 0.0
+        mf &= finite
+        rf[~mf], tf[~mf] = np.nan, np.nan
 
         # Rear half of the disk.
         rb, tb, zb = self.disk_coords(x0=x0, y0=y0, inc=inc, PA=PA, z0=-z0,
                                       psi=psi, r_cavity=r_cavity,
                                       r_taper=r_taper, q_taper=q_taper)
-        mb = np.logical_and(zb <= 0.0, np.isfinite(self.data))
-        rb = np.where(mb, rb, np.nan)
-        tb = np.where(mb, tb, np.nan)
+        mb = zb <= 0.0
+        mb &= finite
+        rb[~mb], tb[~mb] = np.nan, np.nan
 
         # Flat disk for masking.
-        rr, _, _ = self.disk_coords(x0=x0, y0=y0, inc=inc, PA=PA)
+        rr = dp.get_midplane_polar_coords(x0, y0, inc, PA, self.xaxis,
+                                          self.yaxis)[0]
 
         # Make sure the bounds are OK.
         r_min = 0.0 if r_min is None else r_min
         r_max = rr.max() if r_max is None else r_max
 
         # Make sure the front side hides the rear.
-        mf = np.logical_and(rf >= r_min, rf <= r_max)
-        mb = np.logical_and(rb >= r_min, rb <= r_max)
-        tf = np.where(mf, tf, np.nan)
-        rb = np.where(~mf, rb, np.nan)
-        tb = np.where(np.logical_and(np.isfinite(rb), mb), tb, np.nan)
+        mf = rf >= r_min
+        mf &= rf <= r_max
+        mb = rb >= r_min
+        mb &= rb <= r_max
+        tf[~mf] = np.nan
+        rb[mf] = np.nan
+        mb &= np.isfinite(rb)
+        tb[~mb] = np.nan
 
         # For some geometries we want to make sure they're not doing funky
         # things in the outer disk when psi is large.
         if check_mask:
-            mm = rr <= check_mask * r_max
-            rf = np.where(mm, rf, np.nan)
-            rb = np.where(mm, rb, np.nan)
-            tf = np.where(mm, tf, np.nan)
-            tb = np.where(mm, tb, np.nan)
+            mm = ~(rr <= check_mask * r_max)
+            rf[mm], rb[mm], tf[mm], tb[mm] = np.nan, np.nan, np.nan, np.nan
 
         # Popluate the kwargs with defaults.
         lw = kwargs.pop('lw', kwargs.pop('linewidth', 1.0))
@@ -1583,22 +1976,41 @@ class rotationmap:
         theta = np.linspace(-np.pi, np.pi, int(ntheta))
         theta += np.diff(theta)[0]
 
-        # Do the plotting.
-        ax.contour(self.xaxis, self.yaxis, rf, levels=radii, colors=c,
+        # Do the plotting. Share the 2D axes between all the contour calls.
+        xx, yy = np.meshgrid(self.xaxis, self.yaxis)
+        ax.contour(xx, yy, rf, levels=radii, colors=c,
                    linewidths=lw, linestyles='-', zorder=zo, **kwargs)
-        for tt in theta:
-            tf_tmp = np.where(abs(tf - tt) <= 0.5, tf, np.nan)
-            ax.contour(self.xaxis, self.yaxis, tf_tmp, levels=[tt], colors=c,
-                       linewidths=lw, linestyles='-', zorder=zo, **kwargs)
-        ax.contour(self.xaxis, self.yaxis, rb, levels=radii, colors=c,
+        rotationmap._plot_theta_contours(ax, xx, yy, tf, theta, colors=c,
+                                         linewidths=lw, linestyles='-',
+                                         zorder=zo, **kwargs)
+        ax.contour(xx, yy, rb, levels=radii, colors=c,
                    linewidths=lw, linestyles='--', zorder=zo, **kwargs)
-        for tt in theta:
-            tb_tmp = np.where(abs(tb - tt) <= 0.5, tb, np.nan)
-            ax.contour(self.xaxis, self.yaxis, tb_tmp, levels=theta, colors=c,
-                       linewidths=lw, linestyles='--', zorder=zo)
+        rotationmap._plot_theta_contours(ax, xx, yy, tb, theta, colors=c,
+                                         linewidths=lw, linestyles='--',
+                                         zorder=zo, **kwargs)
 
         return ax
 
+    @staticmethod
+    def _plot_theta_contours(ax, xx, yy, tvals, theta, **kwargs):
+        """
+        Contour the polar angles ``tvals``, on the 2D sky coordinates ``xx``
+        and ``yy``, at the levels ``theta``. To avoid tracing the branch cut
+        at +/- pi, levels with ``|theta| <= pi / 2`` are drawn from ``tvals``
+        and the others from ``tvals`` wrapped to [0, 2 pi), each masked to
+        within 0.5 rad of its levels.
+        """
+        theta = theta[abs(theta) <= np.pi]
+        inner = abs(theta) <= 0.5 * np.pi
+        if inner.any():
+            tt = np.where(abs(tvals) <= 0.5 * np.pi + 0.5, tvals, np.nan)
+            ax.contour(xx, yy, tt, levels=theta[inner], **kwargs)
+        if (~inner).any():
+            tt = np.mod(tvals, 2.0 * np.pi)
+            tt[abs(tt - np.pi) > 0.5 * np.pi + 0.5] = np.nan
+            levels = np.sort(np.mod(theta[~inner], 2.0 * np.pi))
+            ax.contour(xx, yy, tt, levels=levels, **kwargs)
+
     def _plot_axes(self, ax, x0=0.0, y0=0.0, inc=0.0, PA=0.0, major=1.0,
                    plot_kwargs=None):
         """
@@ -1617,11 +2029,13 @@ class rotationmap:
         Returns:
             matplotlib axis: Matplotlib ax with axes drawn.
         """
-        x = np.array([major, -major, 0.0, 0.0])
-        y = np.array([0.0, 0.0, major * np.cos(np.radians(inc)),
-                      -major * np.cos(np.radians(inc))])
-        x, y = self._rotate_coords(x, y, PA=PA)
-        x, y = x + x0, y + y0
+        minor = major * math.cos(math.radians(inc))
+        cos_PA = math.cos(math.radians(PA))
+        sin_PA = math.sin(math.radians(PA))
+        x = np.array([major * sin_PA, -major * sin_PA,
+                      minor * cos_PA, -minor * cos_PA]) + x0
+        y = np.array([major * cos_PA, -major * cos_PA,
+                      -minor * sin_PA, minor * sin_PA]) + y0
         plot_kwargs = {} if plot_kwargs is None else plot_kwargs
         c = plot_kwargs.pop('c', plot_kwargs.pop('color', 'k'))
         ls = plot_kwargs.pop('ls', plot_kwargs.pop('linestyle', ':'))
@@ -1682,7 +2096,7 @@ class rotationmap:
                                         r_max=r_max, r_min=r_min,
                                         smooth=smooth,
                                         through_center=through_center)
-        r_max = r_max * np.cos(np.radians(inc))
+        r_max = r_max * math.cos(math.radians(inc))
         x_min, y_min = self.find_minima(x0=x0, y0=y0, PA=PA, vlsr=vlsr,
                                         r_max=r_max, r_min=r_min,
                                         smooth=smooth,
@@ -1712,12 +2126,11 @@ class rotationmap:
         # Cycle through the plots.
         for s, sample in enumerate(samples):
             fig, ax = plt.subplots()
-            for walker in sample.T:
-                if labels[s] == 'lnprob':
-                    ax.semilogy(walker, alpha=0.1, color='k')
-                    ax.set_ylim([np.min(sample[~np.isnan(sample)])*0.9, np.max(sample[~np.isnan(sample)])*1.1])
-                else:
-                    ax.plot(walker, alpha=0.1, color='k')
+            if labels[s] == 'lnprob':
+                ax.semilogy(sample, alpha=0.1, color='k')
+                ax.set_ylim([np.nanmin(sample) * 0.9, np.nanmax(sample) * 1.1])
+            else:
+                ax.plot(sample, alpha=0.1, color='k')
             ax.set_xlabel('Steps')
             if labels is not None:
                 ax.set_ylabel(labels[s])
@@ -1730,9 +2143,9 @@ class rotationmap:
                                     fig.get_figheight(), forward=True)
                 ax_divider = make_axes_locatable(ax)
                 bins = np.linspace(ax.get_ylim()[0], ax.get_ylim()[1], 50)
-                hist, _ = np.histogram(sample[nburnin:].flatten(), bins=bins,
+                hist, _ = np.histogram(sample[nburnin:].ravel(), bins=bins,
                                        density=True)
-                bins = np.average([bins[1:], bins[:-1]], axis=0)
+                bins = 0.5 * (bins[1:] + bins[:-1])
                 ax1 = ax_divider.append_axes("right", size="35%", pad="2%")
                 ax1.fill_betweenx(bins, hist, np.zeros(bins.size), step='mid',
                                   color='darkgray', lw=0.0)
@@ -1,3 +1,4 @@
+import math
 import numpy as np
 from . import deprojection as dp
 import numba
@@ -10,34 +11,85 @@ msun = 1.988e30
 
 # -- Functions to build projected velocity profiles. -- #
 
-@numba.njit
-def proj_vkep(rvals, tvals, zvals, dist, mstar, inc):
-    """Projected Keplerian rotational velocity profile."""
-    rvals = rvals * au * dist
-    zvals = zvals * au * dist
-    v_phi = G * mstar * msun * np.power(rvals, 2)
-    v_phi = np.sqrt(v_phi * np.power(np.hypot(rvals, zvals), -3))
-    return proj_vphi(v_phi, tvals, inc)
-
-
-@numba.njit
-def proj_vpow(rvals, tvals, zvals, dist, mstar, inc, vp_q, vp_100, vp_qtaper, vp_rtaper):
-    """Projected power-law rotational velocity profile."""
-    v_phi = (rvals * dist / 100.)**vp_q
-    v_phi *= np.exp(-(rvals / vp_rtaper)**vp_qtaper)
-    v_phi = proj_vphi(vp_100 * v_phi, tvals, inc)
-    v_rad = (rvals * dist / 100.)**vr_q
-    v_rad = proj_vrad(vr_100 * v_rad, tvals, inc)
-    return v_phi + v_rad
-
-
-@numba.njit
-def proj_vphi(v_phi, tvals, inc):
-    """Project the rotational velocity."""
-    return v_phi * np.cos(tvals) * abs(np.sin(np.radians(inc)))
-
-
-@numba.njit
-def proj_vrad(v_rad, tvals, inc):
-    """Project the radial velocity."""
-    return v_rad * np.sin(tvals) * abs(np.sin(np.radians(inc)))
+def proj_vkep(rvals, tvals, zvals, dist, mstar, inc, out=None):
+    """
+    Projected Keplerian rotational velocity profile. If provided, ``out`` must
+    be a C-contiguous array matching the shape and dtype of the result.
+    """
+    shape = np.shape(rvals)
+    dtype = np.result_type(rvals, np.float32)
+    rvals = np.ascontiguousarray(rvals, dtype=dtype).ravel()
+    tvals = np.ascontiguousarray(tvals, dtype=dtype).ravel()
+    zvals = np.ascontiguousarray(zvals, dtype=dtype).ravel()
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    v_out = out.reshape(-1)
+    gm_scale = G * mstar * msun / au / dist
+    sin_inc = abs(math.sin(math.radians(inc)))
+    dp._aot(_proj_vkep_kernel, dtype)(rvals, tvals, zvals, gm_scale,
+                                      sin_inc, v_out)
+    return out
+
+
+@numba.njit(parallel=True, fastmath=dp._FASTMATH, error_model='numpy',
+            cache=True)
+def _proj_vkep_kernel(rvals, tvals, zvals, gm_scale, sin_inc, v_out):
+    """
+    Per-pixel projected Keplerian velocity. ``rvals`` and ``zvals`` are in
+    [arcsec] and ``gm_scale`` is ``G * M_star / (au * dist)``.
+    """
+    for i in numba.prange(rvals.size):
+        r, z = rvals[i], zvals[i]
+        d2 = r * r + z * z
+        v_phi = math.sqrt(gm_scale * r * r / (d2 * math.sqrt(d2)))
+        v_out[i] = _proj_vphi(v_phi, tvals[i], sin_inc)
+
+
+def proj_vpow(rvals, tvals, zvals, dist, mstar, inc, vp_q, vp_100,
+              vp_qtaper, vp_rtaper, vr_q=0.0, vr_100=0.0, out=None):
+    """
+    Projected power-law rotational and radial velocity profile. If provided,
+    ``out`` must be a C-contiguous array matching the shape and dtype of the
+    result.
+    """
+    shape = np.shape(rvals)
+    dtype = np.result_type(rvals, np.float32)
+    rvals = np.ascontiguousarray(rvals, dtype=dtype).ravel()
+    tvals = np.ascontiguousarray(tvals, dtype=dtype).ravel()
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    v_out = out.reshape(-1)
+    sin_inc = abs(math.sin(math.radians(inc)))
+    dp._aot(_proj_vpow_kernel, dtype)(rvals, tvals, dist / 100., sin_inc,
+                                      vp_q, vp_100, vp_qtaper, vp_rtaper,
+                                      vr_q, vr_100, v_out)
+    return out
+
+
+@numba.njit(parallel=True, fastmath=dp._FASTMATH, error_model='numpy',
+            cache=True)
+def _proj_vpow_kernel(rvals, tvals, r_scale, sin_inc, vp_q, vp_100,
+                      vp_qtaper, vp_rtaper, vr_q, vr_100, v_out):
+    """
+    Per-pixel projected power-law velocity. ``rvals * r_scale`` is the radius
+    in units of 100 au.
+    """
+    for i in numba.prange(rvals.size):
+        r = rvals[i]
+        v_phi = vp_100 * (r * r_scale)**vp_q
+        v_phi *= math.exp(-(r / vp_rtaper)**vp_qtaper)
+        v_rad = vr_100 * (r * r_scale)**vr_q
+        v_out[i] = (_proj_vphi(v_phi, tvals[i], sin_inc)
+                    + _proj_vrad(v_rad, tvals[i], sin_inc))
+
+
+@numba.njit(inline='always', fastmath=dp._FASTMATH, error_model='numpy')
+def _proj_vphi(v_phi, tvals, sin_inc):
+    """Project the rotational velocity, with ``sin_inc = |sin(inc)|``."""
+    return v_phi * np.cos(tvals) * sin_inc
+
+
+@numba.njit(inline='always', fastmath=dp._FASTMATH, error_model='numpy')
+def _proj_vrad(v_rad, tvals, sin_inc):
+    """Project the radial velocity, with ``sin_inc = |sin(inc)|``."""
+    return v_rad * np.sin(tvals) * sin_inc
@@ -21,7 +21,7 @@ setup(
     install_requires=[
         "scipy>=1",
         "numpy",
-        "matplotlib>=3",
+        "matplotlib>=3.3",
         "emcee>=3",
         "corner>=2",
         "zeus-mcmc",
@@ -0,0 +1,33 @@
+import numpy as np
+from astropy.io import fits
+from eddy.fit_cube import rotationmap
+
+
+def _write_maps(tmp_path, npix=32, dpix=0.05):
+    """Write a smooth velocity map and its uncertainties in [m/s]."""
+    axis = (np.arange(npix) - npix / 2 + 0.5) * dpix
+    xx, yy = np.meshgrid(axis, axis)
+    data = 5e3 + 2e3 * xx / (1.0 + np.hypot(xx, yy)**2)
+    paths = []
+    for name, image in [('map_v0.fits', data),
+                        ('map_dv0.fits', np.full(data.shape, 50.0))]:
+        hdu = fits.PrimaryHDU(image.astype(np.float32))
+        hdu.header['cdelt1'] = -dpix / 3600.
+        hdu.header['cdelt2'] = dpix / 3600.
+        hdu.header['crpix1'] = npix / 2 + 1
+        hdu.header['crpix2'] = npix / 2 + 1
+        hdu.writeto(str(tmp_path / name))
+        paths.append(str(tmp_path / name))
+    return paths
+
+
+def test_fit_map_with_worker_pool(tmp_path):
+    path, uncertainty = _write_maps(tmp_path)
+    cube = rotationmap(path, uncertainty=uncertainty)
+    params = {'inc': 30.0, 'PA': 0, 'mstar': 1, 'vlsr': 2, 'dist': 100.0}
+    samples = cube.fit_map(p0=[90.0, 1.0, 5e3], params=params,
+                           optimize=False, nwalkers=8, nburnin=2, nsteps=2,
+                           plots=['none'], returns=['samples'], pool=2,
+                           emcee_kwargs={'progress': False})
+    assert samples.shape == (16, 3)
+    assert np.all(np.isfinite(samples))